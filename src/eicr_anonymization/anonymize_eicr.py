@@ -4,6 +4,7 @@ import glob
 import logging
 import os
 from argparse import Namespace
+from collections.abc import Iterator
 
 from lxml import etree
 from lxml.etree import Element
@@ -16,7 +17,6 @@ from eicr_anonymization.tags.Tag import Tag
 logger = logging.getLogger(__name__)
 
 NAMESPACE = "urn:hl7-org:v3"
-NAMESPACES = {"ns": NAMESPACE}
 
 
 def _delete_old_anonymized_files(input_location: str) -> None:
@@ -31,20 +31,6 @@ def _delete_old_anonymized_files(input_location: str) -> None:
         os.remove(output_file)
 
 
-def _find_elements(root: Element, path: str) -> list[Element]:
-    """Find all elements for a given path with the HL7 namespace in an EICR XML file.
-
-    Args:
-        root: Root XML element to search
-        path: XPath query to find elements
-
-    Returns:
-        List of matching XML elements
-
-    """
-    return root.xpath(path, namespaces=NAMESPACES)
-
-
 def _should_anonymize_element(element: Element, tag: Tag) -> bool:
     """Determine if an XML element should be anonymized.
 
@@ -57,34 +43,28 @@ def _should_anonymize_element(element: Element, tag: Tag) -> bool:
 
     """
     text_is_nonempty = bool(element.text and element.text.strip())
-    attr_is_sensitive = hasattr(tag, "sensitive_attr") and any(
-        attr in element.attrib for attr in tag.sensitive_attr
-    )
+    attr_is_sensitive = any(attr in element.attrib for attr in tag.sensitive_attr)
     return text_is_nonempty or attr_is_sensitive
 
 
-def _build_xpath_query(instance: Tag) -> str:
-    """Construct an XPath query to find a specific XML element.
+def _iter_sensitive_elements(root: Element) -> Iterator[tuple[Element, Tag]]:
+    """Iterate over the elements in the XML root that should be anonymized.
 
     Args:
-        instance: Tag instance to find
+        root: Root XML element to search
 
-    Returns:
-        Constructed XPath query string
+    Yields:
+        Each sensitive element paired with its Tag instance
 
     """
-    xpath_parts = [f".//ns:{instance.name}"]
-
-    if instance.text:
-        xpath_parts.append(f"[text()='{instance.text}']")
+    tag_registry = Tag.get_registry()
 
-    if instance.attributes:
-        for attr_name, attr_value in instance.attributes.items():
-            xpath_parts.append(f'[@{attr_name}="{attr_value}"]')
-    else:
-        xpath_parts.append("[not(@*)]")
-
-    return "".join(xpath_parts)
+    # Walk the tree once and look up each HL7 element's Tag class by name, rather than running
+    # a separate descendant search for every registered tag
+    for element in root.iter(f"{{{NAMESPACE}}}*"):
+        tag = tag_registry.get(etree.QName(element).localname)
+        if tag is not None and _should_anonymize_element(element, tag):
+            yield element, tag(text=element.text, attributes=dict(element.attrib))
 
 
 def _collect_sensitive_tag_groups(root: Element) -> NormalizedTagGroups:
@@ -98,17 +78,9 @@ def _collect_sensitive_tag_groups(root: Element) -> NormalizedTagGroups:
 
     """
     sensitive_tag_groups = NormalizedTagGroups()
-    tag_registry = Tag.get_registry().values()
-
-    for tag in tag_registry:
-        elements = _find_elements(root, f".//ns:{tag.name}")
-        for element in elements:
-            if _should_anonymize_element(element, tag):
-                tag_instance = tag(
-                    text=element.text,
-                    attributes=dict(element.attrib),
-                )
-                sensitive_tag_groups.add(tag_instance)
+
+    for _, tag_instance in _iter_sensitive_elements(root):
+        sensitive_tag_groups.add(tag_instance)
 
     return sensitive_tag_groups
 
@@ -127,27 +99,26 @@ def _replace_sensitive_information(
 
     """
     debug_output = []
+    replacement_mapping: dict[Tag, Tag] = {}
 
     for tag_group in sensitive_tag_groups:
-        replacement_mapping = tag_group.get_replacement_mapping()
-
-        for instance in tag_group:
-            replacement = replacement_mapping[instance]
-            xpath = _build_xpath_query(instance)
-
-            matches = _find_elements(root, xpath)
-
-            for match in matches:
-                # Replace text if applicable
-                if instance.text:
-                    match.text = replacement.text
-
-                # Replace attributes
-                for attr, new_val in replacement.attributes.items():
-                    if attr in match.attrib:
-                        match.attrib[attr] = new_val
-
-            debug_output.append([instance, replacement])
+        group_mapping = tag_group.get_replacement_mapping()
+        replacement_mapping.update(group_mapping)
+        debug_output.extend([instance, group_mapping[instance]] for instance in tag_group)
+
+    # Replace every sensitive element in a second walk of the tree, rather than searching the
+    # whole tree again for each instance
+    for element, instance in _iter_sensitive_elements(root):
+        replacement = replacement_mapping[instance]
+
+        # Replace text if applicable
+        if instance.text:
+            element.text = replacement.text
+
+        # Replace attributes
+        for attr, new_val in replacement.attributes.items():
+            if attr in element.attrib:
+                element.attrib[attr] = new_val
 
     return debug_output
 
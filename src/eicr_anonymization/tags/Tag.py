@@ -2,11 +2,17 @@
 
 import re
 from datetime import datetime, timedelta
-from random import choice, randint, random
+from random import choice, randint, random, randrange
+from string import ascii_uppercase, digits
 from typing import ClassVar, Literal, NotRequired, TypedDict
 
 import yaml
 
+try:
+    from yaml import CSafeLoader as _YamlLoader
+except ImportError:
+    from yaml import SafeLoader as _YamlLoader
+
 
 class ReplacementType(TypedDict):
     """Type definition for a replacement."""
@@ -20,7 +26,7 @@ class ReplacementType(TypedDict):
 def _read_yaml(file_name: str) -> list[ReplacementType]:
     """Read a YAML file and return its contents as a list of strings."""
     with open("src/eicr_anonymization/star-wars-data/" + file_name) as file:
-        return yaml.safe_load(file)
+        return yaml.load(file, Loader=_YamlLoader)
 
 
 def _get_leading_trailing_whitespace(value: str) -> tuple[str, str]:
@@ -74,33 +80,43 @@ class Tag:
     """Tag class."""
 
     default_replace_value = "REMOVED"
+    # Attributes whose values are sensitive and must be replaced
+    sensitive_attr: ClassVar[tuple[str, ...]] = ()
 
     _registry: ClassVar[dict[str, "Tag"]] = {}
 
     def __init_subclass__(cls, **kwargs) -> None:
         """Register the tag class."""
         super().__init_subclass__(**kwargs)
-        if hasattr(cls, "name") and cls.name:
+        # Only register classes that declare their own name, without walking the MRO
+        if cls.__dict__.get("name"):
             Tag._registry[cls.name] = cls
-        cls._used_replacements: set[str] = set()
+        cls._replacement_pool: list[str] = []
 
     def __init__(self, text: str | None = None, attributes: dict[str, str] | None = None):
         """Initialize the tag."""
         self._text = text
-        self._attributes = attributes or {}
+        self._attributes = dict(attributes or {})
+        self._normalized_text = self.normalize(text)
+        self._sorted_attributes = tuple(sorted(self._attributes.items()))
+        self._normalized_attributes = tuple(
+            (key, self.normalize(value)) for key, value in self._sorted_attributes
+        )
+        self._hash: int | None = None
+        self._normalized_hash: int | None = None
 
     def __repr__(self) -> str:
         """Get a string representation of the tag."""
-        repr = f"<{self.name}"
-        for attribute in self.attributes:
-            repr += f' {attribute}="{self.attributes[attribute]}"'
+        parts = [f"<{self.name}"]
+        for attribute, value in self.attributes.items():
+            parts.append(f' {attribute}="{value}"')
 
         if self.text:
-            repr += f">{self.text}</{self.name}>"
+            parts.append(f">{self.text}</{self.name}>")
         else:
-            repr += " />"
+            parts.append(" />")
 
-        return repr
+        return "".join(parts)
 
     def __setattr__(self, name, value):
         """Make name, sensitive_attr, and replacements read-only."""
@@ -117,24 +133,27 @@ class Tag:
         - They have the same text when normalized.
         - They have the same attributes and the same values for those attributes
         """
+        # Compare the per-instance values first; they are the most likely to differ
         return (
             isinstance(other, self.__class__)
-            and self.name == other.name
-            and getattr(self, "sensitive_attr", None) == getattr(other, "sensitive_attr", None)
             and self.normalized_text == other.normalized_text
             and self.attributes == other.attributes
+            and self.name == other.name
+            and self.sensitive_attr == other.sensitive_attr
         )
 
     def __hash__(self) -> int:
         """Get the hash of the tag."""
-        return hash(
-            (
-                self.name,
-                self.text,
-                self._tuple_attributes(),
-                getattr(self, "sensitive_attr", None),
+        if self._hash is None:
+            self._hash = hash(
+                (
+                    self.name,
+                    self.text,
+                    self._tuple_attributes(),
+                    self.sensitive_attr,
+                )
             )
-        )
+        return self._hash
 
     @classmethod
     def get_registry(cls) -> dict[str, "Tag"]:
@@ -150,16 +169,12 @@ class Tag:
         """Get a replacement mapping."""
         replacement = cls.get_replacement_value(raw_values)
 
-        sensitive_attr_replacements = None
-        if hasattr(cls, "sensitive_attr"):
-            sensitive_attr_replacements = {}
-            for attr in cls.sensitive_attr:
-                sensitive_attr_replacements[attr] = replacement
+        sensitive_attr_replacements = dict.fromkeys(cls.sensitive_attr, replacement)
 
         mapping = {}
         for tag in raw_values:
             attribute_replacements = tag.attributes.copy() if tag.attributes else None
-            if sensitive_attr_replacements:
+            if sensitive_attr_replacements and attribute_replacements:
                 for attr, value in sensitive_attr_replacements.items():
                     if attr in attribute_replacements:
                         attribute_replacements[attr] = value
@@ -175,13 +190,13 @@ class Tag:
     def get_replacement_value(cls, raw_values: set["Tag"]) -> str:
         """Get a replacement value."""
         if hasattr(cls, "replacement_values") and cls.replacement_values:
-            replacements = cls.replacement_values
-            replacements = [r for r in replacements if r["value"] not in cls._used_replacements]
-            if not replacements:
-                cls._used_replacements.clear()
-                replacements = cls.replacement_values
-            replacement = choice(replacements)["value"]
-            cls._used_replacements.add(replacement)
+            # Draw without repeats until every value has been used, then start over
+            if not cls._replacement_pool:
+                cls._replacement_pool = [r["value"] for r in cls.replacement_values]
+            pool = cls._replacement_pool
+            i = randrange(len(pool))
+            pool[i], pool[-1] = pool[-1], pool[i]
+            replacement = pool.pop()
         else:
             replacement = cls.default_replace_value
         return replacement
@@ -202,7 +217,7 @@ class Tag:
     @property
     def normalized_text(self) -> str:
         """Get the normalized text of the tag."""
-        return self.normalize(self._text)
+        return self._normalized_text
 
     @property
     def attributes(self) -> dict[str, str]:
@@ -212,25 +227,25 @@ class Tag:
     @property
     def normalized_attributes(self) -> tuple[str, str]:
         """Get the hash of the attributes."""
-        return tuple(
-            [(key, self.normalize(value)) for key, value in sorted(self.attributes.items())]
-        )
+        return self._normalized_attributes
 
     @property
     def normalized_hash(self) -> int:
         """Get the hash of the normalized text."""
-        return hash(
-            (
-                self.name,
-                self.normalized_text,
-                self.normalized_attributes,
-                getattr(self, "sensitive_attr", None),
+        if self._normalized_hash is None:
+            self._normalized_hash = hash(
+                (
+                    self.name,
+                    self.normalized_text,
+                    self.normalized_attributes,
+                    self.sensitive_attr,
+                )
             )
-        )
+        return self._normalized_hash
 
     def _tuple_attributes(self) -> int:
         """Get the tuples of the attributes."""
-        return tuple(sorted(self.attributes.items()))
+        return self._sorted_attributes
 
 
 class FamilyTag(Tag):
@@ -265,8 +280,9 @@ class StreetAddressLineTag(Tag):
     """Street address tag class."""
 
     name = "streetAddressLine"
-    _street_names = _read_yaml("street_names.yaml")
-    _street_types = _read_yaml("street_types.yaml")
+    _street_names = tuple(x["value"] for x in _read_yaml("street_names.yaml"))
+    _street_types = tuple(x["value"] for x in _read_yaml("street_types.yaml"))
+    _directions = ("N", "NE", "E", "SE", "S", "SW", "W", "NW")
 
     @classmethod
     def get_replacement_value(
@@ -288,24 +304,17 @@ class StreetAddressLineTag(Tag):
         pre_direction_chance = 0.33
         post_direction_chance = 0.67
         if direction_type < pre_direction_chance:
-            pre_direction = choice(["N", "NE", "E", "SE", "S", "SW", "W", "NW"])
+            pre_direction = choice(cls._directions)
         elif direction_type < post_direction_chance:
-            post_direction = choice(["N", "NE", "E", "SE", "S", "SW", "W", "NW"])
+            post_direction = choice(cls._directions)
 
-        street_name = choice(cls._street_names)["value"]
-        street_type = choice(cls._street_types)["value"]
+        street_name = choice(cls._street_names)
+        street_type = choice(cls._street_types)
         replacement = " ".join(
-            filter(
-                None,
-                [
-                    str(number),
-                    pre_direction,
-                    street_name,
-                    street_type,
-                    post_direction,
-                ],
-            )
-        ).strip()
+            part
+            for part in (str(number), pre_direction, street_name, street_type, post_direction)
+            if part
+        )
 
         return replacement
 
@@ -384,6 +393,12 @@ class NameTag(Tag):
     """Name tag class."""
 
     name = "name"
+    _facility_types = ("Medical Center", "Hospital", "Clinic", "Laboratory", "Pharmacy", "Lab")
+    # Reuse the lists already loaded by the other tags instead of re-reading the YAML per call
+    _name_pools = tuple(
+        tuple(x["value"] for x in tag.replacement_values)
+        for tag in (FamilyTag, CityTag, CountyTag, StateTag, CountryTag)
+    )
 
     @classmethod
     def get_replacement_value(
@@ -391,19 +406,10 @@ class NameTag(Tag):
         raw_values: set["Tag"],
     ) -> dict[str, str]:
         """Get a replacement value."""
-        type = ["Medical Center", "Hospital", "Clinic", "Laboratory", "Pharmacy", "Lab"]
-        names = [
-            _read_yaml("family_names.yaml"),
-            _read_yaml("city_names.yaml"),
-            _read_yaml("county_names.yaml"),
-            _read_yaml("state_names.yaml"),
-            _read_yaml("country_names.yaml"),
-        ]
-
         replacement = " ".join(
             [
-                choice(choice(names))["value"],
-                choice(type),
+                choice(choice(cls._name_pools)),
+                choice(cls._facility_types),
             ]
         )
 
@@ -417,6 +423,19 @@ class TemporalTag(Tag):
     SECONDS_IN_100_YEARS = int(100 * 60 * 60 * 24 * 365.25)
     # The main offset is a random number of seconds between 0 and 100 years
     main_offset = randint(0, SECONDS_IN_100_YEARS)
+    # Inferring datetime format is hard. So far I have seen 5 formats:
+    # 1. YYYYMMDDHHMMSS
+    # 2. YYYYMMDDHHMMSS+/-HHMM
+    # 3. YYYYMMDD
+    # 4. YYYYMMDDHHMM
+    # 5. YYYYMMDDHHMM+/-HHMM
+    known_formats: ClassVar[tuple[tuple[re.Pattern, str], ...]] = (
+        (re.compile(r"\d{14}"), "%Y%m%d%H%M%S"),
+        (re.compile(r"\d{14}[+-]\d{4}"), "%Y%m%d%H%M%S%z"),
+        (re.compile(r"\d{8}"), "%Y%m%d"),
+        (re.compile(r"\d{12}"), "%Y%m%d%H%M"),
+        (re.compile(r"\d{12}[+-]\d{4}"), "%Y%m%d%H%M%z"),
+    )
 
     @classmethod
     def get_replacement_mapping(
@@ -424,31 +443,35 @@ class TemporalTag(Tag):
         normalized_tag: Tag,
         raw_values: set["Tag"],
     ) -> dict[str, str]:
-        """Get a replacement value."""
-        # Convert the value into a datetime object
-        # Indfering datetime format is hard. So far I have seen 3 formats:
-        # 1. YYYYMMDDHHMMSS
-        # 2. YYYYMMDDHHMMSS+/-HHMM
-        # 3. YYYYMMDD
-        known_formats = [
-            "%Y%m%d%H%M%S",
-            "%Y%m%d%H%M%S%z",
-            "%Y%m%d",
-        ]
-        # Check if the value is in one of the known formats
-        for fmt in known_formats:
-            try:
-                date_time = datetime.strptime(normalized_tag.attributes["value"], fmt)
-                break
-            except ValueError:
-                continue
+        """Get a replacement value.
+
+        Raises:
+            ValueError: If the value attribute is not in one of the known formats
+
+        """
+        # Pick the format by shape rather than trying strptime with each one
+        value = normalized_tag.attributes["value"]
+        fmt = next((fmt for pattern, fmt in cls.known_formats if pattern.fullmatch(value)), None)
+        if fmt is not None:
+            date_time = datetime.strptime(value, fmt)
+        else:
+            # strptime is lenient about field widths, so try each format in turn for other shapes
+            for _, fmt in cls.known_formats:
+                try:
+                    date_time = datetime.strptime(value, fmt)
+                    break
+                except ValueError:
+                    continue
+            else:
+                raise ValueError(f"Unrecognized datetime format in {normalized_tag.name} value")
 
-        date_time = date_time - timedelta(seconds=cls.main_offset)
+        date_time -= timedelta(seconds=cls.main_offset)
+        replacement_value = date_time.strftime(fmt)
 
         mapping = {}
         for tag in raw_values:
-            attribute_replacements = tag.attributes.copy() if tag.attributes else None
-            attribute_replacements["value"] = date_time.strftime(fmt)
+            attribute_replacements = tag.attributes.copy()
+            attribute_replacements["value"] = replacement_value
 
             mapping[tag] = tag.__class__(text=tag.text, attributes=attribute_replacements)
 
@@ -485,29 +508,27 @@ class IdTag(Tag):
     name = "id"
     sensitive_attr = ("extension", "root")
     oid_pattern = re.compile(r"^[0-2](\.(0|[1-9][0-9]*))+$")
-    _root_oids: ClassVar[dict[int, dict[str, str]]] = {}
-    _extension_oids: ClassVar[dict[int, dict[str, str]]] = {}
+    # Replacement for each OID segment, keyed by (position, segment)
+    _root_oids: ClassVar[dict[tuple[int, str], int]] = {}
+    _extension_oids: ClassVar[dict[tuple[int, str], int]] = {}
 
     def __init__(self, text=None, attributes=None):
         """Initialize the ID tag."""
         super().__init__(text, attributes)
 
-        if self.__class__.oid_pattern.match(self.attributes.get("root")):
-            segments = self.attributes["root"].split(".")
-            for i, segment in enumerate(segments):
-                if segment not in self._root_oids:
-                    self.__class__._root_oids.setdefault(i, {})[segment] = _get_random_int(
-                        len(segment)
-                    )
+        root = self.attributes.get("root")
+        if root and self.__class__.oid_pattern.match(root):
+            segments = root.split(".")
+            for key in enumerate(segments):
+                if key not in self._root_oids:
+                    self._root_oids[key] = _get_random_int(len(key[1]))
         if self.attributes.get("extension") and self.__class__.oid_pattern.match(
             self.attributes["extension"]
         ):
             segments = self.attributes["extension"].split(".")
-            for i, segment in enumerate(segments):
-                if segment not in self._extension_oids:
-                    self.__class__._extension_oids.setdefault(i, {})[segment] = _get_random_int(
-                        len(segment)
-                    )
+            for key in enumerate(segments):
+                if key not in self._extension_oids:
+                    self._extension_oids[key] = _get_random_int(len(key[1]))
 
     @classmethod
     def normalize(cls, value: str | None) -> str:
@@ -525,15 +546,15 @@ class IdTag(Tag):
     ) -> dict[Tag, Tag]:
         """Get a replacement mapping for sensitive attributes."""
         # Build a dictionary of sensitive attribute replacements.
-        if cls.oid_pattern.match(normalized_tag.attributes["root"]):
-            segments = normalized_tag.attributes["root"].split(".")
+        root = normalized_tag.attributes.get("root")
+        if root and cls.oid_pattern.match(root):
+            segments = root.split(".")
             try:
-                replacement_parts = [
-                    str(cls._root_oids[i][segment]) for i, segment in enumerate(segments)
-                ]
+                replacement_parts = [str(cls._root_oids[key]) for key in enumerate(segments)]
             except KeyError as exc:
+                _, segment = exc.args[0]
                 raise ValueError(
-                    f"Segment {exc.args[0]} not found in root OID mapping for {normalized_tag.name}"
+                    f"Segment {segment} not found in root OID mapping for {normalized_tag.name}"
                 ) from exc
 
             sensitive_attr_replacements = {"root": ".".join(replacement_parts)}
@@ -567,15 +588,15 @@ class IdTag(Tag):
     @staticmethod
     def random_alpha_digits(value):
         """Generate a random string of digits and uppercase letters."""
-        replacement = ""
+        replacement = []
         for char in value:
             if char.isdigit():
-                replacement += str(randint(0, 9))
+                replacement.append(choice(digits))
             elif char.isalpha():
-                replacement += choice("ABCDEFGHIJKLMNOPQRSTUVWXYZ")
+                replacement.append(choice(ascii_uppercase))
             else:
-                replacement += char
-        return replacement
+                replacement.append(char)
+        return "".join(replacement)
 
 
 class TextTag(Tag):
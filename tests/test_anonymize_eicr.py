@@ -0,0 +1,60 @@
+"""Test the anonymize_eicr module."""
+
+from lxml import etree
+
+from eicr_anonymization.anonymize_eicr import (
+    _collect_sensitive_tag_groups,
+    _replace_sensitive_information,
+)
+from eicr_anonymization.tags.Tag import FamilyTag, GivenTag
+
+EICR = b"""<ClinicalDocument xmlns="urn:hl7-org:v3" xmlns:sdtc="urn:hl7-org:sdtc">
+  <recordTarget>
+    <patientRole>
+      <patient>
+        <name>
+          <given>Joe</given>
+          <family>Bloggs</family>
+        </name>
+        <sdtc:family>Smith</sdtc:family>
+      </patient>
+    </patientRole>
+  </recordTarget>
+  <author>
+    <assignedAuthor>
+      <assignedPerson>
+        <name>
+          <family>BLOGGS</family>
+        </name>
+      </assignedPerson>
+    </assignedAuthor>
+  </author>
+</ClinicalDocument>
+"""
+
+
+def test_collect_sensitive_tag_groups():
+    """Test that registered HL7 elements are collected and grouped by normalized value."""
+    root = etree.fromstring(EICR)
+
+    groups = {
+        group.type: {tag.text for tag in group} for group in _collect_sensitive_tag_groups(root)
+    }
+
+    assert groups == {GivenTag: {"Joe"}, FamilyTag: {"Bloggs", "BLOGGS"}}
+
+
+def test_replace_sensitive_information():
+    """Test that every sensitive element is replaced consistently, including quoted text."""
+    root = etree.fromstring(EICR.replace(b"Joe", b"O'Brien"))
+    sensitive_tag_groups = _collect_sensitive_tag_groups(root)
+
+    debug_output = _replace_sensitive_information(root, sensitive_tag_groups)
+
+    given = root.find(".//{urn:hl7-org:v3}given").text
+    family, family_upper = (element.text for element in root.iter("{urn:hl7-org:v3}family"))
+    assert given != "O'Brien"
+    assert family != "Bloggs"
+    assert family_upper == family.upper()
+    assert root.find(".//{urn:hl7-org:sdtc}family").text == "Smith"
+    assert {original.text for original, _ in debug_output} == {"O'Brien", "Bloggs", "BLOGGS"}
@@ -32,3 +32,14 @@ def test_get_registry():
     assert registry["family"] == FamilyTag
 
 
+def test_get_replacement_value_uses_every_value_before_repeating():
+    """Test that get_replacement_value does not repeat a value until all have been used."""
+
+    class VocabularyTag(Tag):
+        replacement_values = ({"value": "a"}, {"value": "b"}, {"value": "c"})
+
+    first_round = [VocabularyTag.get_replacement_value(None) for _ in range(3)]
+    second_round = [VocabularyTag.get_replacement_value(None) for _ in range(3)]
+
+    assert sorted(first_round) == ["a", "b", "c"]
+    assert sorted(second_round) == ["a", "b", "c"]
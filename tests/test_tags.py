@@ -1,4 +1,6 @@
 import random
+from datetime import datetime, timedelta
+from functools import cache
 
 import pytest
 
@@ -9,6 +11,7 @@ from eicr_anonymization.tags.Tag import (
     FamilyTag,
     GivenTag,
     HighTag,
+    IdTag,
     LowTag,
     NameTag,
     PostalCodeTag,
@@ -16,6 +19,7 @@ from eicr_anonymization.tags.Tag import (
     StateTag,
     StreetAddressLineTag,
     SuffixTag,
+    Tag,
     TelecomTag,
     TimeTag,
 )
@@ -34,6 +38,93 @@ def set_random_seed(request):
     random.seed(repeat_iteration)
 
 
+@cache
+def _lowered_replacement_values(tag: type[Tag]) -> frozenset[str]:
+    """Get the lowercased replacement values of a tag class, computed once per class."""
+    return frozenset(x["value"].lower() for x in tag.replacement_values)
+
+
+def _case_flags(value: str) -> tuple[bool, bool]:
+    """Get whether a string is all uppercase and whether it is all lowercase."""
+    return value.isupper(), value.islower()
+
+
+def _whitespace_lengths(value: str) -> tuple[int, int]:
+    """Get the number of leading and trailing whitespace characters in a string."""
+    return len(value) - len(value.lstrip()), len(value) - len(value.rstrip())
+
+
+@pytest.mark.parametrize(
+    "tag",
+    [
+        FamilyTag,
+        GivenTag,
+        PrefixTag,
+        SuffixTag,
+        StreetAddressLineTag,
+        CityTag,
+        CountyTag,
+        StateTag,
+        CountryTag,
+        PostalCodeTag,
+        TelecomTag,
+        NameTag,
+        TimeTag,
+        LowTag,
+        HighTag,
+    ],
+)
+@pytest.mark.parametrize(
+    ("text", "attributes", "expected"),
+    [
+        (None, None, "<{name} />"),
+        ("test", None, "<{name}>test</{name}>"),
+        ("test", {"test_attr": "test_value"}, '<{name} test_attr="test_value">test</{name}>'),
+    ],
+    ids=["empty", "text", "text_and_attributes"],
+)
+def test_repr(tag, text, attributes, expected):
+    """Test the __repr__ method of each tag class."""
+    assert repr(tag(text, attributes)) == expected.format(name=tag.name)
+
+
+@pytest.mark.parametrize(
+    ("tag", "expected"),
+    [
+        (FamilyTag, "family"),
+        (GivenTag, "given"),
+        (PrefixTag, "prefix"),
+        (SuffixTag, "suffix"),
+        (StreetAddressLineTag, "streetAddressLine"),
+        (CityTag, "city"),
+        (CountyTag, "county"),
+        (StateTag, "state"),
+        (CountryTag, "country"),
+        (PostalCodeTag, "postalCode"),
+        (TelecomTag, "telecom"),
+        (NameTag, "name"),
+        (TimeTag, "time"),
+        (LowTag, "low"),
+        (HighTag, "high"),
+    ],
+)
+def test_name(tag, expected):
+    """Test the name property of each tag class."""
+    assert tag().name == expected
+
+
+@pytest.mark.parametrize(
+    "tag",
+    [FamilyTag, GivenTag, PrefixTag, SuffixTag, CityTag, CountyTag, StateTag, CountryTag],
+)
+@pytest.mark.repeat(3)
+def test_get_replacement_value(set_random_seed, tag):
+    """Test that tags without their own logic draw a value from their replacement values."""
+    random_name = tag.get_replacement_value(None)
+
+    assert random_name.lower() in _lowered_replacement_values(tag)
+
+
 class TestFamilyTag:
     """Test the FamilyTag class.
 
@@ -47,11 +138,6 @@ class TestFamilyTag:
         assert tag.text is None
         assert tag.attributes == {}
 
-    def test_name(self):
-        """Test the name property."""
-        tag = FamilyTag()
-        assert tag.name == "family"
-
     def test_text(self):
         """Test the text property."""
         tag = FamilyTag("Bloggs")
@@ -63,176 +149,37 @@ class TestFamilyTag:
         tag = FamilyTag("testName", attributes)
         assert tag.attributes == attributes
 
-    @pytest.mark.parametrize(
-        ("text", "attributes", "expected"),
-        [
-            (None, None, "<family />"),
-            ("test", None, "<family>test</family>"),
-            ("test", {"test_attr": "test_value"}, '<family test_attr="test_value">test</family>'),
-        ],
-    )
-    def test_repr(self, text, attributes, expected):
-        """Test the __repr__ method."""
-        tag = FamilyTag(text, attributes)
-        assert repr(tag) == expected
-
-    @pytest.mark.repeat(3)
-    def test_get_replacement_value(self, set_random_seed):
-        """Test the get_replacement_value method."""
-        possible_replacements = {x["value"].lower() for x in FamilyTag.replacement_values}
-        random_name = FamilyTag.get_replacement_value(None)
+    def test_attributes_copied(self):
+        """Test that changing the caller's attributes dict does not change the tag."""
+        attributes = {"test_attr": "test_value"}
+        tag = FamilyTag("Bloggs", attributes)
+        attributes["test_attr"] = "new_value"
 
-        assert any(name.lower() in random_name.lower() for name in possible_replacements)
+        assert tag.attributes == {"test_attr": "test_value"}
+        expected = FamilyTag("Bloggs", {"test_attr": "test_value"})
+        assert tag == expected
+        assert hash(tag) == hash(expected)
 
     @pytest.mark.parametrize(("orginal_values"), [{"Bloggs", " bloggs "}])
     @pytest.mark.repeat(3)
     def test_get_replacement_mapping(self, set_random_seed, orginal_values):
         """Test the get_replacement_mapping method."""
-        possible_replacements = {x["value"].lower() for x in FamilyTag.replacement_values}
-        orginal_tags = set()
-        for initial_value in orginal_values:
-            orginal_tags.add(FamilyTag(initial_value))
+        possible_replacements = _lowered_replacement_values(FamilyTag)
+        orginal_tags = {FamilyTag(initial_value) for initial_value in orginal_values}
         mapping = FamilyTag.get_replacement_mapping(None, orginal_tags)
 
         for orginal, replacement in mapping.items():
             assert type(orginal) is type(replacement)
             assert orginal.attributes == replacement.attributes
             assert replacement.text.strip().lower() in possible_replacements
-            assert orginal.text.isupper() == replacement.text.isupper()
-            assert orginal.text.islower() == replacement.text.islower()
-
-            assert len(orginal.text) - len(orginal.text.lstrip()) == len(replacement.text) - len(
-                replacement.text.lstrip()
-            )
-            assert len(orginal.text) - len(orginal.text.rstrip()) == len(replacement.text) - len(
-                replacement.text.rstrip()
-            )
-
-
-class TestGivenTag:
-    """Test the GivenTag class.
-
-    Does not have any unique logic so skips most of the tests.
-    """
-
-    def test_name(self):
-        """Test the name property."""
-        tag = GivenTag()
-        assert tag.name == "given"
-
-    @pytest.mark.parametrize(
-        ("text", "attributes", "expected"),
-        [
-            (None, None, "<given />"),
-            ("test", None, "<given>test</given>"),
-            ("test", {"test_attr": "test_value"}, '<given test_attr="test_value">test</given>'),
-        ],
-    )
-    def test_repr(self, text, attributes, expected):
-        """Test the __repr__ method."""
-        tag = GivenTag(text, attributes)
-        assert repr(tag) == expected
-
-    @pytest.mark.repeat(3)
-    def test_get_replacement_value(self, set_random_seed):
-        """Test the get_replacement_value method."""
-        possible_replacements = {x["value"].lower() for x in GivenTag.replacement_values}
-        random_name = GivenTag.get_replacement_value(None)
-
-        assert any(name.lower() in random_name.lower() for name in possible_replacements)
-
-
-class TestPrefixTag:
-    """Test the PrefixTag class.
-
-    Does not have any unique logic so skips most of the tests.
-    """
-
-    def test_name(self):
-        """Test the name property."""
-        tag = PrefixTag()
-        assert tag.name == "prefix"
-
-    @pytest.mark.parametrize(
-        ("text", "attributes", "expected"),
-        [
-            (None, None, "<prefix />"),
-            ("test", None, "<prefix>test</prefix>"),
-            ("test", {"test_attr": "test_value"}, '<prefix test_attr="test_value">test</prefix>'),
-        ],
-    )
-    def test_repr(self, text, attributes, expected):
-        """Test the __repr__ method."""
-        tag = PrefixTag(text, attributes)
-        assert repr(tag) == expected
-
-    @pytest.mark.repeat(3)
-    def test_get_replacement_value(self, set_random_seed):
-        """Test the get_replacement_value method."""
-        possible_replacements = {x["value"].lower() for x in PrefixTag.replacement_values}
-        random_name = PrefixTag.get_replacement_value(None)
-
-        assert any(name.lower() in random_name.lower() for name in possible_replacements)
+            assert _case_flags(orginal.text) == _case_flags(replacement.text)
 
-
-class TestSuffixTag:
-    """Test the SuffixTag class.
-
-    Does not have any unique logic so skips most of the tests.
-    """
-
-    def test_name(self):
-        """Test the name property."""
-        tag = SuffixTag()
-        assert tag.name == "suffix"
-
-    @pytest.mark.parametrize(
-        ("text", "attributes", "expected"),
-        [
-            (None, None, "<suffix />"),
-            ("test", None, "<suffix>test</suffix>"),
-            ("test", {"test_attr": "test_value"}, '<suffix test_attr="test_value">test</suffix>'),
-        ],
-    )
-    def test_repr(self, text, attributes, expected):
-        """Test the __repr__ method."""
-        tag = SuffixTag(text, attributes)
-        assert repr(tag) == expected
-
-    @pytest.mark.repeat(3)
-    def test_get_replacement_value(self, set_random_seed):
-        """Test the get_replacement_value method."""
-        possible_replacements = {x["value"].lower() for x in SuffixTag.replacement_values}
-        random_name = SuffixTag.get_replacement_value(None)
-
-        assert any(name.lower() in random_name.lower() for name in possible_replacements)
+            assert _whitespace_lengths(orginal.text) == _whitespace_lengths(replacement.text)
 
 
 class TestStreetAddressLineTag:
     """Test the StreetAddressLineTag class."""
 
-    def test_name(self):
-        """Test the name property."""
-        tag = StreetAddressLineTag()
-        assert tag.name == "streetAddressLine"
-
-    @pytest.mark.parametrize(
-        ("text", "attributes", "expected"),
-        [
-            (None, None, "<streetAddressLine />"),
-            ("test", None, "<streetAddressLine>test</streetAddressLine>"),
-            (
-                "test",
-                {"test_attr": "test_value"},
-                '<streetAddressLine test_attr="test_value">test</streetAddressLine>',
-            ),
-        ],
-    )
-    def test_repr(self, text, attributes, expected):
-        """Test the __repr__ method."""
-        tag = StreetAddressLineTag(text, attributes)
-        assert repr(tag) == expected
-
     @pytest.mark.repeat(3)
     def test_get_replacement_value(self, set_random_seed):
         """Test the get_replacement_value method.
@@ -240,196 +187,20 @@ class TestStreetAddressLineTag:
         This method makes an entirely random street address. The only thing to really test is
         whether it contains a street name and type from the YAML files.
         """
-        possible_street_names = {
-            street["value"].lower() for street in StreetAddressLineTag._street_names
-        }
+        possible_street_names = {street.lower() for street in StreetAddressLineTag._street_names}
         possible_street_types = {
-            street_type["value"].lower() for street_type in StreetAddressLineTag._street_types
+            street_type.lower() for street_type in StreetAddressLineTag._street_types
         }
 
-        random_address = StreetAddressLineTag.get_replacement_value(None)
-
-        assert any(
-            street_name.lower() in random_address.lower() for street_name in possible_street_names
-        )
-        assert any(
-            street_type.lower() in random_address.lower() for street_type in possible_street_types
-        )
-
-
-class TestCityTag:
-    """Test the CityTag class.
-
-    Does not have any unique logic so skips most of the tests.
-    """
-
-    def test_name(self):
-        """Test the name property."""
-        tag = CityTag()
-        assert tag.name == "city"
-
-    @pytest.mark.parametrize(
-        ("text", "attributes", "expected"),
-        [
-            (None, None, "<city />"),
-            ("test", None, "<city>test</city>"),
-            (
-                "test",
-                {"test_attr": "test_value"},
-                '<city test_attr="test_value">test</city>',
-            ),
-        ],
-    )
-    def test_repr(self, text, attributes, expected):
-        """Test the __repr__ method."""
-        tag = CityTag(text, attributes)
-        assert repr(tag) == expected
-
-    @pytest.mark.repeat(3)
-    def test_get_replacement_value(self, set_random_seed):
-        """Test the get_replacement_value method."""
-        possible_replacements = {x["value"].lower() for x in CityTag.replacement_values}
-        random_name = CityTag.get_replacement_value(None)
+        random_address = StreetAddressLineTag.get_replacement_value(None).lower()
 
-        assert any(name.lower() in random_name.lower() for name in possible_replacements)
-
-
-class TestCountyTag:
-    """Test the CountyTag class.
-
-    Does not have any unique logic so skips most of the tests.
-    """
-
-    def test_name(self):
-        """Test the name property."""
-        tag = CountyTag()
-        assert tag.name == "county"
-
-    @pytest.mark.parametrize(
-        ("text", "attributes", "expected"),
-        [
-            (None, None, "<county />"),
-            ("test", None, "<county>test</county>"),
-            (
-                "test",
-                {"test_attr": "test_value"},
-                '<county test_attr="test_value">test</county>',
-            ),
-        ],
-    )
-    def test_repr(self, text, attributes, expected):
-        """Test the __repr__ method."""
-        tag = CountyTag(text, attributes)
-        assert repr(tag) == expected
-
-    @pytest.mark.repeat(3)
-    def test_get_replacement_value(self, set_random_seed):
-        """Test the get_replacement_value method."""
-        possible_replacements = {x["value"].lower() for x in CountyTag.replacement_values}
-        random_name = CountyTag.get_replacement_value(None)
-
-        assert any(name.lower() in random_name.lower() for name in possible_replacements)
-
-
-class TestStateTag:
-    """Test the StateTag class.
-
-    Does not have any unique logic so skips most of the tests.
-    """
-
-    def test_name(self):
-        """Test the name property."""
-        tag = StateTag()
-        assert tag.name == "state"
-
-    @pytest.mark.parametrize(
-        ("text", "attributes", "expected"),
-        [
-            (None, None, "<state />"),
-            ("test", None, "<state>test</state>"),
-            (
-                "test",
-                {"test_attr": "test_value"},
-                '<state test_attr="test_value">test</state>',
-            ),
-        ],
-    )
-    def test_repr(self, text, attributes, expected):
-        """Test the __repr__ method."""
-        tag = StateTag(text, attributes)
-        assert repr(tag) == expected
-
-    @pytest.mark.repeat(3)
-    def test_get_replacement_value(self, set_random_seed):
-        """Test the get_replacement_value method."""
-        possible_replacements = {x["value"].lower() for x in StateTag.replacement_values}
-        random_name = StateTag.get_replacement_value(None)
-
-        assert any(name.lower() in random_name.lower() for name in possible_replacements)
-
-
-class TestCountryTag:
-    """Test the CountryTag class.
-
-    Does not have any unique logic so skips most of the tests.
-    """
-
-    def test_name(self):
-        """Test the name property."""
-        tag = CountryTag()
-        assert tag.name == "country"
-
-    @pytest.mark.parametrize(
-        ("text", "attributes", "expected"),
-        [
-            (None, None, "<country />"),
-            ("test", None, "<country>test</country>"),
-            (
-                "test",
-                {"test_attr": "test_value"},
-                '<country test_attr="test_value">test</country>',
-            ),
-        ],
-    )
-    def test_repr(self, text, attributes, expected):
-        """Test the __repr__ method."""
-        tag = CountryTag(text, attributes)
-        assert repr(tag) == expected
-
-    @pytest.mark.repeat(3)
-    def test_get_replacement_value(self, set_random_seed):
-        """Test the get_replacement_value method."""
-        possible_replacements = {x["value"].lower() for x in CountryTag.replacement_values}
-        random_name = CountryTag.get_replacement_value(None)
-
-        assert any(name.lower() in random_name.lower() for name in possible_replacements)
+        assert any(street_name in random_address for street_name in possible_street_names)
+        assert any(street_type in random_address for street_type in possible_street_types)
 
 
 class TestPostalCodeTag:
     """Test the PostalCodeTag class."""
 
-    def test_name(self):
-        """Test the name property."""
-        tag = PostalCodeTag()
-        assert tag.name == "postalCode"
-
-    @pytest.mark.parametrize(
-        ("text", "attributes", "expected"),
-        [
-            (None, None, "<postalCode />"),
-            ("test", None, "<postalCode>test</postalCode>"),
-            (
-                "test",
-                {"test_attr": "test_value"},
-                '<postalCode test_attr="test_value">test</postalCode>',
-            ),
-        ],
-    )
-    def test_repr(self, text, attributes, expected):
-        """Test the __repr__ method."""
-        tag = PostalCodeTag(text, attributes)
-        assert repr(tag) == expected
-
     @pytest.mark.repeat(3)
     def test_get_replacement_value(self, set_random_seed):
         """Test the get_replacement_value method.
@@ -449,130 +220,90 @@ class TestPostalCodeTag:
             pytest.fail("Invalid zip code length")
 
 
-class TestTelecomTag:
-    """Test the TelecomTag class."""
-
-    def test_name(self):
-        """Test the name property."""
-        tag = TelecomTag()
-        assert tag.name == "telecom"
-
-    @pytest.mark.parametrize(
-        ("text", "attributes", "expected"),
-        [
-            (None, None, "<telecom />"),
-            ("test", None, "<telecom>test</telecom>"),
-            (
-                "test",
-                {"test_attr": "test_value"},
-                '<telecom test_attr="test_value">test</telecom>',
-            ),
-        ],
-    )
-    def test_repr(self, text, attributes, expected):
-        """Test the __repr__ method."""
-        tag = TelecomTag(text, attributes)
-        assert repr(tag) == expected
-
 class TestNameTag:
     """Test the NameTag class."""
 
-    def test_name(self):
-        """Test the name property."""
-        tag = NameTag()
-        assert tag.name == "name"
-
-    @pytest.mark.parametrize(
-        ("text", "attributes", "expected"),
-        [
-            (None, None, "<name />"),
-            ("test", None, "<name>test</name>"),
-            (
-                "test",
-                {"test_attr": "test_value"},
-                '<name test_attr="test_value">test</name>',
-            ),
-        ],
-    )
-    def test_repr(self, text, attributes, expected):
-        """Test the __repr__ method."""
-        tag = NameTag(text, attributes)
-        assert repr(tag) == expected
-
-
-class TestTimeTag:
-    """Test the TimeTag class."""
-
-    def test_name(self):
-        """Test the name property."""
-        tag = TimeTag()
-        assert tag.name == "time"
-
-    @pytest.mark.parametrize(
-        ("text", "attributes", "expected"),
-        [
-            (None, None, "<time />"),
-            ("test", None, "<time>test</time>"),
-            (
-                "test",
-                {"test_attr": "test_value"},
-                '<time test_attr="test_value">test</time>',
-            ),
-        ],
-    )
-    def test_repr(self, text, attributes, expected):
-        """Test the __repr__ method."""
-        tag = TimeTag(text, attributes)
-        assert repr(tag) == expected
-
-
-class TestLowTag:
-    """Test the LowTag class."""
+    @pytest.mark.repeat(3)
+    def test_get_replacement_value(self, set_random_seed):
+        """Test the get_replacement_value method.
 
-    def test_name(self):
-        """Test the name property."""
-        tag = LowTag()
-        assert tag.name == "low"
+        The replacement is a name from one of the other tags' vocabularies followed by a facility
+        type.
+        """
+        possible_names = {name for pool in NameTag._name_pools for name in pool}
+        random_name = NameTag.get_replacement_value(None)
 
-    @pytest.mark.parametrize(
-        ("text", "attributes", "expected"),
-        [
-            (None, None, "<low />"),
-            ("test", None, "<low>test</low>"),
-            (
-                "test",
-                {"test_attr": "test_value"},
-                '<low test_attr="test_value">test</low>',
-            ),
-        ],
-    )
-    def test_repr(self, text, attributes, expected):
-        """Test the __repr__ method."""
-        tag = LowTag(text, attributes)
-        assert repr(tag) == expected
+        facility_type = next(
+            (t for t in NameTag._facility_types if random_name.endswith(f" {t}")), None
+        )
 
+        assert facility_type is not None
+        assert random_name.removesuffix(f" {facility_type}") in possible_names
 
-class TestHighTag:
-    """Test the HighTag class."""
 
-    def test_name(self):
-        """Test the name property."""
-        tag = HighTag()
-        assert tag.name == "high"
+class TestTimeTag:
+    """Test the TimeTag class."""
 
     @pytest.mark.parametrize(
-        ("text", "attributes", "expected"),
+        ("value", "fmt"),
         [
-            (None, None, "<high />"),
-            ("test", None, "<high>test</high>"),
-            (
-                "test",
-                {"test_attr": "test_value"},
-                '<high test_attr="test_value">test</high>',
-            ),
+            ("20200102030405", "%Y%m%d%H%M%S"),
+            ("20200102030405-0500", "%Y%m%d%H%M%S%z"),
+            ("20200102", "%Y%m%d"),
+            ("202001020304", "%Y%m%d%H%M"),
+            ("202001020304-0500", "%Y%m%d%H%M%z"),
         ],
     )
-    def test_repr(self, text, attributes, expected):
-        """Test the __repr__ method."""
-        tag = HighTag(text, attributes)
-        assert repr(tag) == expected
+    def test_get_replacement_mapping(self, value, fmt):
+        """Test that the value is shifted back by the offset and keeps its format."""
+        tag = TimeTag(attributes={"value": value})
+        mapping = TimeTag.get_replacement_mapping(tag, {tag})
+
+        expected = datetime.strptime(value, fmt) - timedelta(seconds=TimeTag.main_offset)
+        assert mapping[tag].attributes["value"] == expected.strftime(fmt)
+
+    def test_get_replacement_mapping_lenient_format(self):
+        """Test that a value of another shape still parses with strptime's lenient field widths."""
+        tag = TimeTag(attributes={"value": "2020010203045"})
+        mapping = TimeTag.get_replacement_mapping(tag, {tag})
+
+        expected = datetime(2020, 1, 2, 3, 4, 5) - timedelta(seconds=TimeTag.main_offset)
+        assert mapping[tag].attributes["value"] == expected.strftime("%Y%m%d%H%M%S")
+
+    def test_get_replacement_mapping_unknown_format(self):
+        """Test that an unrecognized datetime format raises a ValueError."""
+        tag = TimeTag(attributes={"value": "2020-01-02"})
+        with pytest.raises(ValueError, match="Unrecognized datetime format"):
+            TimeTag.get_replacement_mapping(tag, {tag})
+
+
+class TestIdTag:
+    """Test the IdTag class."""
+
+    def test_init_without_root(self):
+        """Test that an ID without a root attribute can be created."""
+        tag = IdTag(attributes={"extension": "12345"})
+        assert tag.attributes == {"extension": "12345"}
+
+    def test_get_replacement_mapping_without_root(self):
+        """Test that an ID without a root attribute has its extension replaced."""
+        tag = IdTag(attributes={"extension": "AB-123"})
+        mapping = IdTag.get_replacement_mapping(tag, {tag})
+
+        replacement = mapping[tag].attributes["extension"]
+        assert replacement[:2].isalpha()
+        assert replacement[2] == "-"
+        assert replacement[3:].isdigit()
+
+    def test_get_replacement_mapping_shared_root_prefix(self):
+        """Test that OID roots sharing a prefix keep sharing it after replacement."""
+        tag1 = IdTag(attributes={"root": "2.16.840.1.113883"})
+        tag2 = IdTag(attributes={"root": "2.16.840.1.999"})
+
+        replacement1 = IdTag.get_replacement_mapping(tag1, {tag1})[tag1].attributes["root"]
+        replacement2 = IdTag.get_replacement_mapping(tag2, {tag2})[tag2].attributes["root"]
+
+        segments1 = replacement1.split(".")
+        segments2 = replacement2.split(".")
+        assert segments1[:4] == segments2[:4]
+        assert [len(x) for x in segments1] == [1, 2, 3, 1, 6]